@@ -4,18 +4,64 @@
     Routines for calculating quantities useful for
     radiative transfer, such as Einstein coefficients
 """
+import functools
+
+import numba
 import numpy as np
 import pandas as pd
 from scipy import constants
 
-from pyspectools.units import kbcm, MHz2cm
+from pyspectools.units import kbcm, MHz2cm, population_difference
+
+
+@functools.lru_cache(maxsize=None)
+def _parallel_ufunc(kernel):
+    """
+    Compile `kernel` into a parallel float64 ufunc with numba. Compiling the
+    parallel target is slow, so it is deferred until the ufunc is first
+    needed rather than being paid on every import of pyspectools.
+    """
+    return numba.vectorize(
+        [numba.float64(numba.float64, numba.float64)],
+        target="parallel",
+        fastmath=True,
+    )(kernel)
+
+
+def __getattr__(name):
+    # The compiled ufuncs are available as `boltzmann_factor_ufunc` and
+    # `einsteinA_ufunc`, for access to ufunc methods like `reduce`
+    kernels = {
+        "boltzmann_factor_ufunc": _boltzmann_kernel,
+        "einsteinA_ufunc": _einsteinA_kernel,
+    }
+    if name in kernels:
+        return _parallel_ufunc(kernels[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _to_numeric(field):
+    # Convert a column of fixed-width byte fields to numbers; blank fields
+    # and SPCAT overflows (e.g. "*****") become NaN
+    return pd.to_numeric(np.char.strip(field), errors="coerce")
+
+
+def _infer_field(field):
+    # Convert a column of fixed-width byte fields the way read_fwf would:
+    # numeric if every field is, otherwise strings, with blanks as NaN
+    values = pd.Series(np.char.strip(field).astype(str)).replace("", np.nan)
+    try:
+        return pd.to_numeric(values)
+    except (ValueError, TypeError):
+        return values
 
 
-def parse_str(filepath):
+def parse_str(filepath, columns=None):
     # Function that will parse a .str file from SPCAT
     # This file can be generated by supplying 0020 as
     # the first flag in the `.int` file.
-    # Returns a Pandas dataframe
+    # Returns a Pandas dataframe; if a list of column
+    # names is given, only those columns are parsed
     names = [
         "Frequency",
         "RTDM",
@@ -24,12 +70,35 @@ def parse_str(filepath):
         "Lower QN",
         "Dipole Category"
         ]
-    # Use fixed-width reading in pandas
-    str_df = pd.read_fwf(
-        filepath,
-        widths=[15, 15, 5, 12, 12, 11],
-        names=names,
-        index=False
+    widths = [15, 15, 5, 12, 12, 11]
+    if columns is None:
+        columns = names
+    unknown = set(columns).difference(names)
+    if unknown or len(columns) == 0:
+        raise ValueError(
+            f"Columns must be a non-empty selection of {names}; got {list(columns)}."
+        )
+    # Only the leading fields up to the last requested column are kept
+    nfields = max(names.index(column) for column in columns) + 1
+    names, widths = names[:nfields], widths[:nfields]
+    with open(filepath, "rb") as read_file:
+        lines = [line for line in read_file.read().splitlines() if line.strip()]
+    # Pack every line into a fixed-width record; short lines are padded
+    # and the columns are then sliced out as a structured view, rather
+    # than going through the pure Python fixed-width reader in pandas
+    records = np.array(lines, dtype=f"S{sum(widths)}").view(
+        [(name, f"S{width}") for name, width in zip(names, widths)]
+    )
+    converters = {
+        "Frequency": _to_numeric,
+        "RTDM": _to_numeric,
+        "Formatting": _to_numeric,
+        "Upper QN": _infer_field,
+        "Lower QN": _infer_field,
+        "Dipole Category": _to_numeric,
+    }
+    str_df = pd.DataFrame(
+        {column: converters[column](records[column]) for column in columns}
     )
     return str_df
 
@@ -40,31 +109,31 @@ def I2S(I, Q, frequency, E_lower, T=300.):
 
     Parameters
     ----------
-    I - float
+    I - float or array_like
         The log of the transition intensity, typically given in catalog files
     Q - float
         Partition function at specified temperature T
-    frequency - float
+    frequency - float or array_like
         Frequency of the transition in MHz
-    E_lower - float
+    E_lower - float or array_like
         Energy of the lower state in wavenumbers
     T - float
         Temperature in Kelvin
 
     Returns
     -------
-    siju - float
+    siju - float or np.ndarray
         Value of the intrinsic linestrength
     """
-    E_upper = calc_E_upper(frequency, E_lower)
+    I = np.asarray(I, dtype=float)
+    frequency = np.asarray(frequency, dtype=float)
+    E_lower = np.asarray(E_lower, dtype=float)
     # top part of the equation
-    A = 10.**I * Q
-    lower_factor = boltzmann_factor(E_lower, T)       # Boltzmann factors
-    upper_factor = boltzmann_factor(E_upper, T)
+    A = np.power(10., I) * Q
     # Calculate the lower part of the equation
     # The prefactor included here is taken from Brian
     # Drouin's notes
-    B = (4.16231e-5 * frequency * (lower_factor - upper_factor))
+    B = (4.16231e-5 * frequency * population_difference(frequency, E_lower, T))
     return A / B
 
 
@@ -88,23 +157,29 @@ def calc_E_upper(frequency, E_lower):
     return transition_freq + E_lower
 
 
-def boltzmann_factor(E, T):
+def _boltzmann_kernel(E, T):
+    return np.exp(-E / (kbcm * T))
+
+
+def boltzmann_factor(E, T, **kwargs):
     """
     Calculate the Boltzmann weighting for a given state and temperature.
 
     Parameters
     ----------
-    E - float
+    E - float or array_like
         State energy in wavenumbers
     T - float
         Temperature in Kelvin
+    kwargs
+        Passed to the compiled ufunc, e.g. `out`
 
     Returns
     -------
-    boltzmann_factor - float
+    boltzmann_factor - float or np.ndarray
         Unitless Boltzmann factor for the state
     """
-    return np.exp(-E / (kbcm * T))
+    return _parallel_ufunc(_boltzmann_kernel)(E, T, **kwargs)
 
 
 def approx_Q_linear(B, T):
@@ -159,7 +234,7 @@ def approx_Q_top(A, B, T, sigma=1, C=None):
     return Q
 
 
-def einsteinA(S, frequency):
+def _einsteinA_kernel(S, frequency):
     # Prefactor is given in the PGopher Intensity formulae
     # http://pgopher.chm.bris.ac.uk/Help/intensityformulae.htm
     # Units of the prefactor are s^-1 MHz^-3 D^-2
@@ -168,6 +243,11 @@ def einsteinA(S, frequency):
     return prefactor * frequency**3. * S
 
 
+def einsteinA(S, frequency, **kwargs):
+    # Additional kwargs are passed to the compiled ufunc, e.g. `out`
+    return _parallel_ufunc(_einsteinA_kernel)(S, frequency, **kwargs)
+
+
 def calc_einstein(str_filepath):
     """ High-level function for calculating Einstein A
         coefficients for a given .str file output from
@@ -180,9 +260,11 @@ def calc_einstein(str_filepath):
     # Calculate the Einstein A coefficients in units
     # of per second
     str_df["Einstein A"] = einsteinA(
-        str_df["TDM"],
-        str_df["Frequency"]
+        str_df["TDM"].to_numpy(dtype=float),
+        str_df["Frequency"].to_numpy(dtype=float)
         )
-    # Sort the dataframe by ascending frequency
-    str_df = str_df.sort_values(["Frequency"], ascending=True)
+    # Sort the dataframe by ascending frequency, by taking rows
+    # in the order given by a stable argsort of the frequencies
+    order = np.argsort(str_df["Frequency"].to_numpy(), kind="stable")
+    str_df = str_df.iloc[order]
     return str_df
@@ -7,7 +7,12 @@
 """
 
 import os
+import dataclasses
+import hashlib
+from collections import Counter
+import json
 import warnings
+from importlib.util import find_spec
 
 try:
     import tables
@@ -16,6 +21,7 @@ try:
 except ImportError:
     warnings.warn(f"PyTables is not installed correctly!")
 
+import numpy as np
 import tinydb
 from tinydb.middlewares import CachingMiddleware
 from tinydb.storages import JSONStorage
@@ -24,14 +30,93 @@ import pandas as pd
 from pyspectools import parsers
 from pyspectools import spectra
 
+if find_spec("orjson"):
+    import orjson
+
+
+class ORJSONStorage(JSONStorage):
+    """
+    TinyDB storage that (de)serializes the database with orjson, which is
+    considerably faster than the standard library `json` module for large
+    catalogs. Formatting kwargs intended for `json.dumps` are ignored, and
+    the file is always written sorted with two space indentation.
+
+    Files written by the standard library may contain NaN, which orjson
+    cannot parse; these are read with `json` instead. orjson writes NaN and
+    infinity as null however, which is why this storage is opt-in.
+    """
+
+    def __init__(self, path, create_dirs=False, access_mode="rb+", **kwargs):
+        super().__init__(path, create_dirs=create_dirs, access_mode=access_mode)
+
+    def read(self):
+        self._handle.seek(0, os.SEEK_END)
+        if not self._handle.tell():
+            # empty file; let TinyDB initialize the database
+            return None
+        self._handle.seek(0)
+        contents = self._handle.read()
+        try:
+            return orjson.loads(contents)
+        except orjson.JSONDecodeError:
+            # e.g. NaN written by the standard library JSONStorage
+            return json.loads(contents)
+
+    def write(self, data):
+        self._handle.seek(0)
+        self._handle.write(
+            orjson.dumps(
+                data,
+                option=orjson.OPT_SORT_KEYS
+                | orjson.OPT_INDENT_2
+                | orjson.OPT_SERIALIZE_NUMPY
+                | orjson.OPT_NON_STR_KEYS,
+            )
+        )
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        # remove anything left over if the database has shrunk
+        self._handle.truncate()
+
+
+def _storage_class(use_orjson=False):
+    # storage used for the database files; orjson has to be asked for
+    if not use_orjson:
+        return JSONStorage
+    if find_spec("orjson") is None:
+        raise ImportError(
+            "orjson is not installed. To use orjson storage, please run `pip install orjson`."
+        )
+    return ORJSONStorage
+
+
+class CountingMiddleware(CachingMiddleware):
+    """
+    CachingMiddleware that counts every write to the database. All of the
+    TinyDB write paths (insert, update, upsert, remove, writes through
+    `db.table`, etc.) end up here, which lets `SpectralCatalog` tell when
+    its caches have gone stale.
+    """
+
+    def __init__(self, storage_cls):
+        super().__init__(storage_cls)
+        self.write_count = 0
+
+    def write(self, data):
+        self.write_count += 1
+        super().write(data)
+
 
 class SpectralCatalog(tinydb.TinyDB):
     """
     Grand unified experimental catalog. Stores assignment and uline information
     across the board.
+
+    Setting `use_orjson` serializes the database with orjson, which is
+    faster for large catalogs; see `ORJSONStorage` for the caveats.
     """
 
-    def __init__(self, dbpath=None):
+    def __init__(self, dbpath=None, use_orjson=False):
         if dbpath is None:
             dbpath = os.path.expanduser("~/.pyspectools/pyspec_experiment.db")
         super().__init__(
@@ -39,8 +124,16 @@ class SpectralCatalog(tinydb.TinyDB):
             sort_keys=True,
             indent=4,
             separators=(",", ": "),
-            storage=CachingMiddleware(JSONStorage),
+            storage=CountingMiddleware(_storage_class(use_orjson)),
         )
+        # digests of every document, built lazily for duplicate checks,
+        # and the write count they are valid for
+        self._digests = None
+        self._digests_written = None
+        # sorted frequencies and document IDs used by search_frequency,
+        # and the write count they are valid for
+        self._freq_index = None
+        self._freq_index_written = None
 
     def __exit__(self, exc_type, exc_value, traceback):
         """
@@ -68,7 +161,7 @@ class SpectralCatalog(tinydb.TinyDB):
         else:
             new_entry = assignment
         if dup_check is True:
-            if any([new_entry == entry for entry in self.all()]) is False:
+            if self._entry_digest(new_entry) not in self._existing_digests():
                 add = True
             else:
                 warnings.warn("Entry already exists in database.")
@@ -77,6 +170,143 @@ class SpectralCatalog(tinydb.TinyDB):
         if add is True:
             self.insert(new_entry)
 
+    @staticmethod
+    def _entry_digest(entry):
+        """
+        Hash the contents of a document, such that duplicate entries can be
+        found by set membership rather than comparing against every document.
+
+        Parameters
+        ----------
+        entry - dict
+            Document to be hashed
+
+        Returns
+        -------
+        str
+            MD5 hex digest of the sorted, JSON serialized document
+        """
+        serialized = json.dumps(
+            SpectralCatalog._canonical(entry), sort_keys=True, default=str
+        )
+        return hashlib.md5(serialized.encode()).hexdigest()
+
+    @staticmethod
+    def _canonical(value):
+        """
+        Recursively convert a value into a form where values that compare
+        equal with `==` also serialize identically; e.g. 8000, 8000.0 and
+        np.int64(8000) all become 8000.0.
+
+        Parameters
+        ----------
+        value - object
+            Document, or a value within a document
+
+        Returns
+        -------
+        object
+            Canonical form of the value
+        """
+        if isinstance(value, (np.generic, np.ndarray)):
+            value = value.tolist()
+        if isinstance(value, dict):
+            return {
+                key: SpectralCatalog._canonical(item) for key, item in value.items()
+            }
+        if isinstance(value, (list, tuple)):
+            return [SpectralCatalog._canonical(item) for item in value]
+        if isinstance(value, (bool, int)):
+            return float(value)
+        return value
+
+    def _existing_digests(self):
+        """
+        Return the counts of digests for documents in the database. The
+        counts are only built from a full pass over the table the first time
+        they are needed, and are then kept up to date by insert, update and
+        remove, so duplicate checks don't rescan it. Any other write to the
+        database (e.g. upsert) causes the counts to be rebuilt.
+
+        Returns
+        -------
+        Counter
+            Number of documents in the database with each digest
+        """
+        if not self._digests_current():
+            self._digests = Counter(
+                self._entry_digest(entry)
+                for entry in self.table(self.default_table_name)
+            )
+            self._digests_written = self.storage.write_count
+        return self._digests
+
+    def _digests_current(self):
+        # whether the digests account for every write so far
+        return self._digests is not None and (
+            self._digests_written == self.storage.write_count
+        )
+
+    def _matching_digests(self, cond=None, doc_ids=None):
+        # digests of the documents that an update or remove call is about
+        # to modify; these are hashed before the call, as an update can
+        # modify nested values of the documents in place
+        table = self.table(self.default_table_name)
+        if doc_ids is not None:
+            documents = [table.get(doc_id=doc_id) for doc_id in doc_ids]
+            documents = [document for document in documents if document is not None]
+        elif cond is not None:
+            documents = table.search(cond)
+        else:
+            # TinyDB applies an unconditional update to every document
+            documents = table
+        return Counter(self._entry_digest(entry) for entry in documents)
+
+    def insert(self, document):
+        tracked = self._digests_current()
+        doc_id = self.table(self.default_table_name).insert(document)
+        if tracked:
+            self._digests[self._entry_digest(document)] += 1
+            self._digests_written = self.storage.write_count
+        return doc_id
+
+    def insert_multiple(self, documents):
+        documents = list(documents)
+        tracked = self._digests_current()
+        doc_ids = self.table(self.default_table_name).insert_multiple(documents)
+        if tracked:
+            self._digests.update(self._entry_digest(document) for document in documents)
+            self._digests_written = self.storage.write_count
+        return doc_ids
+
+    def update(self, fields, cond=None, doc_ids=None):
+        table = self.table(self.default_table_name)
+        tracked = self._digests_current()
+        if tracked:
+            before = self._matching_digests(cond, doc_ids)
+        doc_ids = table.update(fields, cond, doc_ids)
+        if tracked:
+            after = [table.get(doc_id=doc_id) for doc_id in doc_ids]
+            self._digests -= before
+            self._digests.update(self._entry_digest(entry) for entry in after)
+            self._digests_written = self.storage.write_count
+        return doc_ids
+
+    def remove(self, cond=None, doc_ids=None):
+        tracked = self._digests_current()
+        if tracked:
+            removed = self._matching_digests(cond, doc_ids)
+        doc_ids = self.table(self.default_table_name).remove(cond, doc_ids)
+        if tracked:
+            self._digests -= removed
+            self._digests_written = self.storage.write_count
+        return doc_ids
+
+    def truncate(self):
+        self.table(self.default_table_name).truncate()
+        self._digests = Counter()
+        self._digests_written = self.storage.write_count
+
     def add_catalog(self, catalog_path, name, formula, **kwargs):
         """
         Load a SPCAT catalog file into the database. Creates independent Transition objects
@@ -93,17 +323,35 @@ class SpectralCatalog(tinydb.TinyDB):
         cat_df = parsers.parse_cat(catalog_path)
         if exist_df is not None:
             # drop all of the entries that are already in the catalog
-            exist_freqs = exist_df["frequency"].values
-            cat_df = cat_df.loc[~cat_df["Frequency"].isin(list(exist_freqs)),]
+            exist_freqs = pd.Index(exist_df["catalog_frequency"].values)
+            cat_df = cat_df.loc[~cat_df["Frequency"].isin(exist_freqs)]
         assign_dict = {"name": name, "formula": formula}
         assign_dict.update(**kwargs)
         # slice out only the relevant information from the dataframe
         select_df = cat_df[["Frequency", "Intensity", "Lower state energy"]]
         select_df.columns = ["catalog_frequency", "catalog_intensity", "ustate_energy"]
         select_dict = select_df.to_dict(orient="records")
+        # build the documents directly from the Transition defaults, rather
+        # than instantiating a Transition for every line in the catalog
+        defaults = spectra.assignment.Transition().__dict__
+        unknown = set(assign_dict).difference(defaults)
+        if unknown:
+            raise TypeError(f"Unexpected Transition attributes: {sorted(unknown)}")
+        # mutable fields get new containers for every line, as they would
+        # from the Transition default factories
+        factories = {
+            attribute.name: attribute.default_factory
+            for attribute in dataclasses.fields(spectra.assignment.Transition)
+            if attribute.default_factory is not dataclasses.MISSING
+        }
         # update each line with the common data entries
         assignments = [
-            spectra.assignment.Transition(**line, **assign_dict).__dict__
+            {
+                **defaults,
+                **{attribute: factory() for attribute, factory in factories.items()},
+                **line,
+                **assign_dict,
+            }
             for line in select_dict
         ]
         # Insert all of the documents en masse
@@ -124,12 +372,14 @@ class SpectralCatalog(tinydb.TinyDB):
         else:
             min_freq = frequency * (1 - freq_prox)
             max_freq = frequency * (1 + freq_prox)
-        Entry = tinydb.Query()
-        matches = self.search(
-            (Entry["frequency"] <= max_freq) & (min_freq <= Entry["frequency"])
-            | (Entry["catalog_frequency"] <= max_freq)
-            & (min_freq <= Entry["catalog_frequency"])
-        )
+        # range query on the sorted frequencies, rather than testing
+        # every document against the window in Python
+        doc_ids = set()
+        for frequencies, ids in self._frequency_index().values():
+            lower = np.searchsorted(frequencies, min_freq, side="left")
+            upper = np.searchsorted(frequencies, max_freq, side="right")
+            doc_ids.update(ids[lower:upper].tolist())
+        matches = [self.get(doc_id=doc_id) for doc_id in sorted(doc_ids)]
         if len(matches) != 0:
             if dataframe is True:
                 return pd.DataFrame(matches)
@@ -138,6 +388,35 @@ class SpectralCatalog(tinydb.TinyDB):
         else:
             return None
 
+    def _frequency_index(self):
+        """
+        Return sorted arrays of the "frequency" and "catalog_frequency" values
+        in the database, along with the corresponding document IDs. The index
+        is built from a single pass over the database, and is rebuilt the next
+        time it is needed after the database is modified.
+
+        Returns
+        -------
+        dict
+            Keys are the field names, and values are tuples of sorted
+            frequencies and document IDs as NumPy arrays
+        """
+        if self._freq_index_written != self.storage.write_count:
+            self._freq_index = dict()
+            self._freq_index_written = self.storage.write_count
+            documents = self.all()
+            for field in ["frequency", "catalog_frequency"]:
+                values = [
+                    (document[field], document.doc_id)
+                    for document in documents
+                    if isinstance(document.get(field), (int, float))
+                ]
+                frequencies = np.array([value[0] for value in values], dtype=float)
+                ids = np.array([value[1] for value in values], dtype=int)
+                order = np.argsort(frequencies, kind="stable")
+                self._freq_index[field] = (frequencies[order], ids[order])
+        return self._freq_index
+
     def _search_field(self, field, value, dataframe=True):
         """
         Function for querying the database for a particular field and value.
@@ -148,13 +427,15 @@ class SpectralCatalog(tinydb.TinyDB):
         :param dataframe: bool, if True will return the matches as a pandas dataframe.
         :return:
         """
+        # repeated searches are served by the query cache of the TinyDB
+        # table, which is cleared whenever the table is written to
         matches = self.search(tinydb.where(field) == value)
         if len(matches) != 0:
             if dataframe is True:
                 df = pd.DataFrame(matches)
                 return df
             else:
-                objects = [spectra.transition.Transition(**data) for data in matches]
+                objects = [spectra.assignment.Transition(**data) for data in matches]
                 return objects
         else:
             return None
@@ -199,7 +480,7 @@ class TheoryCatalog(tinydb.TinyDB):
     Grand unified theory catalog.
     """
 
-    def __init__(self, dbpath=None):
+    def __init__(self, dbpath=None, use_orjson=False):
         if dbpath is None:
             dbpath = os.path.expanduser("~/.pyspectools/pyspec_theory.db")
-        super().__init__(dbpath)
+        super().__init__(dbpath, storage=_storage_class(use_orjson))
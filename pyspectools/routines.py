@@ -4,10 +4,14 @@ Run SPFIT and/or SPCAT
 """
 
 import os
+import math
 import subprocess
 import shutil
 import json
 import types
+from copy import deepcopy
+from decimal import Decimal
+from functools import lru_cache
 from typing import List, Any, Union, Dict, Tuple
 from glob import glob
 
@@ -20,24 +24,27 @@ import paramiko
 __yaml_obj__ = yaml.YAML(typ="safe")
 
 
-def run_spcat(filename: str, temperature=None):
-    # Run SPCAT
+def run_spcat(filename: str, temperature=None, cwd=None):
+    # Run SPCAT; if cwd is given, filename is relative to it and SPCAT
+    # is run from that directory
+    filepath = filename if cwd is None else os.path.join(cwd, filename)
     parameter_file = filename + ".var"
-    if os.path.isfile(filename + ".var") is False:
+    if os.path.isfile(filepath + ".var") is False:
         print("VAR file unavailable. Attempting to run with PAR file.")
-        if os.path.isfile(filename + ".par") is False:
+        if os.path.isfile(filepath + ".par") is False:
             raise FileNotFoundError("No .var or .par file found.")
         else:
-            shutil.copy2(filename + ".par", parameter_file)
-    process = subprocess.Popen(
+            shutil.copy2(filepath + ".par", filepath + ".var")
+    process = subprocess.run(
         ["spcat", filename + ".int", parameter_file],
         stdout=subprocess.PIPE,  # suppress stdout
+        check=True,
+        cwd=cwd,
     )
-    process.wait()
     # Extract the partition function at the specified temperature
     if temperature is not None:
         # Read in the piped standard output, and format into a list
-        stdout = str(process.communicate()[0]).split("\\n")
+        stdout = process.stdout.decode().split("\n")
         for line in stdout:
             if temperature in line:
                 # If the specified temperature is found, get the partition
@@ -46,26 +53,30 @@ def run_spcat(filename: str, temperature=None):
         return Q
 
 
-def run_calbak(filename: str):
+def run_calbak(filename: str, cwd=None):
     """Runs the calbak routine, which generates a .lin file from the .cat"""
-    if os.path.isfile(filename + ".cat") is False:
-        raise FileNotFoundError(filename + ".cat is missing; cannot run calbak.")
-    process = subprocess.Popen(
-        ["calbak", filename + ".cat", filename + ".lin"], stdout=subprocess.DEVNULL
+    filepath = filename if cwd is None else os.path.join(cwd, filename)
+    if os.path.isfile(filepath + ".cat") is False:
+        raise FileNotFoundError(filepath + ".cat is missing; cannot run calbak.")
+    subprocess.run(
+        ["calbak", filename + ".cat", filename + ".lin"],
+        stdout=subprocess.DEVNULL,
+        check=True,
+        cwd=cwd,
     )
-    process.wait()
-    with open(filename + ".lin") as read_file:
-        lin_length = read_file.readlines()
-    if lin_length == 0:
+    if os.path.getsize(filepath + ".lin") == 0:
         raise RuntimeError("No lines produced in calbak! Check .cat file.")
 
 
-def run_spfit(filename: str):
+def run_spfit(filename: str, cwd=None):
     """
 
     Parameters
     ----------
     filename
+    cwd : str, optional
+        Directory to run SPFIT from, which filename is relative to; by
+        default the current working directory
 
     Returns
     -------
@@ -75,11 +86,53 @@ def run_spfit(filename: str):
         ["spfit", filename + ".lin", filename + ".par"],
         timeout=20.0,
         capture_output=True,
+        cwd=cwd,
     )
     if process.returncode != 0:
         raise OSError("SPFIT failed to run.")
 
 
+def run_many(filepaths: List[str], stage="spfit", n_jobs=-1):
+    """
+    Run one of the Pickett programs on a set of files in parallel, with
+    one worker process per file. Each program is run from the directory
+    that contains its file, and because SPFIT/SPCAT/calbak name their
+    outputs after the input, every file must have a unique path.
+
+    Parameters
+    ----------
+    filepaths : List[str]
+        Paths to the files to run, without the extension; e.g. "1/hc3n"
+    stage : str, optional
+        Which program to run: "spfit", "spcat", or "calbak", by default "spfit"
+    n_jobs : int, optional
+        Number of worker processes; by default -1, which uses every core
+
+    Returns
+    -------
+    list
+        Return values of the corresponding `run_*` function for each file
+    """
+    if stage not in __pickett_stages__:
+        raise ValueError(
+            f"Unknown stage {stage}; choose from {list(__pickett_stages__)}."
+        )
+    filepaths = [os.path.abspath(filepath) for filepath in filepaths]
+    if len(set(filepaths)) != len(filepaths):
+        raise ValueError("Duplicate files would overwrite each other's output.")
+    pool = joblib.Parallel(n_jobs=n_jobs)
+    return pool(joblib.delayed(_run_stage)(filepath, stage) for filepath in filepaths)
+
+
+def _run_stage(filepath: str, stage: str):
+    # run a Pickett program from the directory that contains the file
+    directory, filename = os.path.split(filepath)
+    return __pickett_stages__[stage](filename, cwd=directory)
+
+
+__pickett_stages__ = {"spfit": run_spfit, "spcat": run_spcat, "calbak": run_calbak}
+
+
 def list_chunks(target: List[Any], n: int):
     """
     Split a list into a number of chunks with length n. If there are not enough elements,
@@ -112,11 +165,9 @@ def human2pickett(name: str, reduction="A", linear=True, nuclei=0):
     pickett_parameters = read_yaml(
         os.path.expanduser("~") + "/.pyspectools/pickett_terms.yml"
     )
-    if name == "B" and linear is True:
+    if name == "B":
         # Haven't thought of a clever way of doing this yet...
-        identifier = 100
-    elif name == "B" and linear is False:
-        identifier = 20000
+        identifier = 100 if linear else 20000
     else:
         # Hyperfine terms
         if name in ["eQq", "eQq/2"]:
@@ -180,6 +231,19 @@ def read_yaml(yaml_filepath: str) -> Dict[Any, Any]:
     Dict[Any, Any]
         Dictionary based on the YAML contents
     """
+    # absolute paths so that a relative path is not confused with a file of
+    # the same name in another working directory
+    yaml_filepath = os.path.abspath(yaml_filepath)
+    stat = os.stat(yaml_filepath)
+    yaml_data = _read_yaml_cached(yaml_filepath, stat.st_mtime_ns, stat.st_size)
+    # copy so that callers modifying the result don't alter the cache
+    return deepcopy(yaml_data)
+
+
+@lru_cache(maxsize=64)
+def _read_yaml_cached(yaml_filepath: str, mtime: int, size: int) -> Dict[Any, Any]:
+    # the modification time and size are part of the key, so an
+    # updated file is parsed again
     with open(yaml_filepath) as read_file:
         yaml_data = __yaml_obj__.load(read_file)
     return yaml_data
@@ -198,6 +262,8 @@ def dump_yaml(yaml_filepath: str, yaml_dict: Dict[Any, Any]):
     """
     with open(yaml_filepath, "w+") as write_file:
         __yaml_obj__.dump(yaml_dict, write_file)
+    # the rewrite may land within the timestamp resolution of the last read
+    _read_yaml_cached.cache_clear()
 
 
 def generate_folder():
@@ -205,39 +271,48 @@ def generate_folder():
     Generates the folder for the next calculation
     and returns the next calculation number
     """
-    folderlist = list_directories()  # get every file/folder in directory
-    # filter out any non-folders that happen to be here
-    shortlist = list()
-    for folder in folderlist:
-        try:
-            shortlist.append(int(folder))
-        except ValueError:  # if it's not an integer
-            pass
-    if len(shortlist) == 0:
-        lastcalc = 0
-    else:
-        lastcalc = max(shortlist)
-    # lastcalc = len(folderlist)
+    # get every numbered folder in the directory; scandir caches the file
+    # type, so this does not need an extra stat per entry
+    with os.scandir() as entries:
+        shortlist = [
+            int(entry.name)
+            for entry in entries
+            if entry.name.isdecimal() and entry.is_dir()
+        ]
+    lastcalc = max(shortlist, default=0)
     os.mkdir(str(lastcalc + 1))
     return lastcalc + 1
 
 
 def format_uncertainty(value: float, uncertainty: float):
-    """Function to determine the number of decimal places to
-    format the uncertainty. Probably not the most elegant way of doing this.
     """
-    # Convert the value into a string, then determine the length by
-    # splitting at the decimal point
-    decimal_places = decimal_length(value)
+    Round an uncertainty to the same number of decimal places as the value
+    it belongs to. An uncertainty finer than the precision of the value is
+    rounded up to one unit in the last decimal place of the value, rather
+    than being lost to rounding.
+
+    Parameters
+    ----------
+    value : float
+        Value that the uncertainty belongs to; e.g. a frequency
+    uncertainty : float
+        Uncertainty in the value
+
+    Returns
+    -------
+    float
+        Uncertainty with the precision of the value
+    """
+    # Work out the number of decimal places in the value once, from the
+    # exponent of its shortest decimal representation
+    decimal_places = max(-Decimal(str(value)).as_tuple().exponent, 0)
     uncertainty = float(uncertainty)  # make sure we're dealing floats
-    uncertainty_places = decimal_length(uncertainty)
-    # Force the uncertainty into decimals
-    uncertainty = uncertainty * 10 ** -uncertainty_places[1]
-    # Work out how many places we've moved now
-    uncertainty_places = decimal_length(uncertainty)
     # Move the precision of the uncertainty to match the precision of the value
-    uncertainty = uncertainty * 10 ** (uncertainty_places[1] - decimal_places[1])
-    return uncertainty
+    rounded = round(uncertainty, decimal_places)
+    if rounded == 0.0 and uncertainty != 0.0:
+        # don't drop a non-zero uncertainty
+        rounded = math.copysign(10.0 ** -decimal_places, uncertainty)
+    return rounded
 
 
 def decimal_length(value: float):
@@ -407,15 +407,12 @@ def I2S(I: float, Q: float, frequency: float, E_lower, T=300.0):
     siju - float
         Value of the intrinsic linestrength
     """
-    E_upper = calc_E_upper(frequency, E_lower)
     # top part of the equation
     A = 10.0 ** I * Q
-    lower_factor = boltzmann_factor(E_lower, T)  # Boltzmann factors
-    upper_factor = boltzmann_factor(E_upper, T)
     # Calculate the lower part of the equation
     # The prefactor included here is taken from Brian
     # Drouin's notes
-    B = 4.16231e-5 * frequency * (lower_factor - upper_factor)
+    B = 4.16231e-5 * frequency * population_difference(frequency, E_lower, T)
     return A / B
 
 
@@ -441,13 +438,10 @@ def S2I(S: float, Q: float, frequency: float, E_lower: float, T=300.0):
     I - float
         log10 of the intensity at the specified temperature
     """
-    E_upper = calc_E_upper(frequency, E_lower)
-    lower_factor = boltzmann_factor(E_lower, T)  # Boltzmann factors
-    upper_factor = boltzmann_factor(E_upper, T)
     # Calculate the lower part of the equation
     # The prefactor included here is taken from Brian
     # Drouin's notes
-    B = 4.16231e-5 * frequency * (lower_factor - upper_factor)
+    B = 4.16231e-5 * frequency * population_difference(frequency, E_lower, T)
     I = np.log((B * S) / Q)
     return I
 
@@ -511,6 +505,32 @@ def boltzmann_factor(E: float, T: float):
     return np.exp(-E / (kbcm * T))
 
 
+def population_difference(frequency: float, E_lower: float, T: float):
+    """
+    Calculate the difference in Boltzmann factors between the lower and upper
+    states of a transition. Rather than evaluating two exponentials, this uses
+    the identity exp(-E_l/kT) - exp(-E_u/kT) = exp(-E_l/kT) * (1 - exp(-dE/kT)),
+    where the second term is computed with `expm1`; this needs one less
+    exponential, and is more accurate when dE << kT.
+
+    Parameters
+    ----------
+    frequency - float
+        Frequency of the transition in MHz
+    E_lower - float
+        Lower state energy in wavenumbers
+    T - float
+        Temperature in Kelvin
+
+    Returns
+    -------
+    float
+        Unitless difference in Boltzmann factors
+    """
+    beta = 1.0 / (kbcm * T)
+    return np.exp(-E_lower * beta) * -np.expm1(-MHz2cm(frequency) * beta)
+
+
 def approx_Q_linear(B: float, T: float):
     """
     Approximate rotational partition function for a linear molecule.
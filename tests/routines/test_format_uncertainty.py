@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import pytest
+
+from pyspectools.routines import format_uncertainty
+
+
+@pytest.mark.parametrize(
+    "value, uncertainty, expected",
+    [
+        (123.45, 0.02, 0.02),
+        (123.456, 0.02, 0.02),
+        (123.456, 0.0024, 0.002),
+        (123.0, 0.3, 0.3),
+        (120, 3, 3.0),
+        (123.4, 0.26, 0.3),
+        (123.456, 0.0, 0.0),
+    ],
+)
+def test_format_uncertainty(value, uncertainty, expected):
+    assert format_uncertainty(value, uncertainty) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "value, uncertainty, expected",
+    [(123.4, 0.02, 0.1), (123.45, 0.001, 0.01), (120, 0.2, 1.0)],
+)
+def test_format_uncertainty_finer_than_value(value, uncertainty, expected):
+    """
+    Uncertainties finer than the precision of the value should not round
+    away to zero, but to one unit in the last place of the value.
+    """
+    assert format_uncertainty(value, uncertainty) == pytest.approx(expected)
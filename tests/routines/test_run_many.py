@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from pyspectools.routines import run_many, run_calbak
+
+
+def test_unknown_stage():
+    with pytest.raises(ValueError, match="Unknown stage"):
+        run_many(["hc3n"], stage="spcalc")
+
+
+def test_duplicate_paths(tmpdir, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    # the same file given as relative and absolute paths
+    with pytest.raises(ValueError, match="Duplicate"):
+        run_many(["hc3n", str(tmpdir.join("hc3n"))])
+
+
+def test_missing_file_in_cwd(tmpdir):
+    # files are looked for relative to cwd, without changing directory
+    current_dir = os.getcwd()
+    with pytest.raises(FileNotFoundError, match=str(tmpdir)):
+        run_many([str(tmpdir.join("hc3n"))], stage="calbak", n_jobs=1)
+    with pytest.raises(FileNotFoundError):
+        run_calbak("hc3n", cwd=str(tmpdir))
+    assert os.getcwd() == current_dir
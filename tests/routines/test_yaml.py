@@ -22,3 +22,26 @@ def test_write_yaml(tmpdir):
     # now do a round trip
     reload = read_yaml(tmp_file)
     assert "ch3cn" in reload
+
+
+def test_reread_yaml(tmpdir):
+    tmp_file = tmpdir.mkdir("temp_yml").join("tmp_file.yml")
+    dump_yaml(tmp_file, {"ch3cn": {"formula": "ch3cn"}})
+    data = read_yaml(tmp_file)
+    # modifying the loaded data should not affect later reads
+    data["ch3cn"]["formula"] = "hc3n"
+    assert read_yaml(tmp_file)["ch3cn"]["formula"] == "ch3cn"
+    # overwriting the file should be picked up by the next read
+    dump_yaml(tmp_file, {"hc3n": {"formula": "hc3n"}})
+    assert "hc3n" in read_yaml(tmp_file)
+
+
+def test_read_yaml_relative_paths(tmpdir, monkeypatch):
+    # files with the same relative path in different directories, which
+    # may share a modification time and size, should not share a cache entry
+    for name in ["a", "b"]:
+        folder = tmpdir.mkdir(name)
+        dump_yaml(folder.join("molecule.yml"), {"name": name})
+    for name in ["a", "b"]:
+        monkeypatch.chdir(tmpdir.join(name))
+        assert read_yaml("molecule.yml")["name"] == name
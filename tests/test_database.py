@@ -0,0 +1,154 @@
+"""
+test_database.py
+
+PyTests to check the functionality of the `SpectralCatalog` in
+`pyspectools.database`.
+"""
+
+import math
+
+import numpy as np
+import pytest
+import tinydb
+
+from pyspectools.database import SpectralCatalog
+
+CATALOG = """\
+   8000.0000  0.0010 -3.5000 3    0.0000  3 -99999 303 1 0 1   0 0 0
+  16000.0000  0.0020 -2.9000 3    0.2669  5 -99999 303 2 0 2   1 0 1
+"""
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    db = SpectralCatalog(str(tmp_path.joinpath("catalog.db")))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def cat_path(tmp_path):
+    path = tmp_path.joinpath("test.cat")
+    path.write_text(CATALOG)
+    return str(path)
+
+
+def test_add_catalog_independent_documents(catalog, cat_path):
+    """
+    Every document made from a catalog should have its own containers,
+    such that modifying one line does not modify the others.
+    """
+    catalog.add_catalog(cat_path, "hc3n", "HC3N")
+    assert len(catalog) == 2
+    first, second = catalog.all()
+    catalog.update(lambda doc: doc["multiple"].append("y"), doc_ids=[first.doc_id])
+    assert catalog.get(doc_id=first.doc_id)["multiple"] == ["y"]
+    assert catalog.get(doc_id=second.doc_id)["multiple"] == []
+
+
+@pytest.mark.parametrize("use_orjson", [False, True])
+def test_read_stdlib_database(tmp_path, use_orjson):
+    """
+    Databases written by the standard library JSONStorage, including NaN
+    and non-string keys, should open with either storage.
+    """
+    if use_orjson:
+        pytest.importorskip("orjson")
+    path = str(tmp_path.joinpath("catalog.db"))
+    with tinydb.TinyDB(path) as db:
+        db.insert({"name": "hc3n", "frequency": float("nan"), "fit": {1: 2.0}})
+    catalog = SpectralCatalog(path, use_orjson=use_orjson)
+    (entry,) = catalog.all()
+    assert math.isnan(entry["frequency"])
+    assert entry["fit"] == {"1": 2.0}
+    # make sure the database can be written back out and reloaded
+    catalog.insert({"name": "hc5n", "fit": {1: 3.0}})
+    catalog.close()
+    catalog = SpectralCatalog(path, use_orjson=use_orjson)
+    assert len(catalog) == 2
+    assert catalog.search_molecule("hc5n", dataframe=False) is not None
+    catalog.close()
+
+
+def test_duplicates_after_update(catalog):
+    """
+    The duplicate check should follow documents through updates, whether
+    they apply to every document or modify nested values in place.
+    """
+    catalog.add_entry({"name": "a", "frequency": 1.0, "multiple": []})
+    catalog.add_entry({"name": "b", "frequency": 2.0, "multiple": []})
+    with pytest.warns(UserWarning):
+        catalog.add_entry({"name": "a", "frequency": 1.0, "multiple": []})
+    assert len(catalog) == 2
+    # unconditional update; the original entries no longer exist
+    catalog.update({"name": "z"})
+    catalog.add_entry({"name": "a", "frequency": 1.0, "multiple": []})
+    assert len(catalog) == 3
+    # in place modification of a nested value
+    catalog.update(
+        lambda doc: doc["multiple"].append("y"), tinydb.where("frequency") == 2.0
+    )
+    catalog.add_entry({"name": "z", "frequency": 2.0, "multiple": []})
+    assert len(catalog) == 4
+    with pytest.warns(UserWarning):
+        catalog.add_entry({"name": "z", "frequency": 2.0, "multiple": ["y"]})
+    assert len(catalog) == 4
+    assert sum(catalog._existing_digests().values()) == len(catalog)
+
+
+def test_duplicates_equal_values(catalog):
+    """
+    Entries should be duplicates whenever their values compare equal, even
+    if they differ in type, e.g. ints, floats and numpy scalars.
+    """
+    catalog.add_entry({"frequency": 8000.0, "peak_id": 3, "fit": {"A": [1.0, 2]}})
+    with pytest.warns(UserWarning):
+        catalog.add_entry(
+            {"frequency": 8000, "peak_id": np.int64(3), "fit": {"A": (1, 2.0)}}
+        )
+    with pytest.warns(UserWarning):
+        catalog.add_entry(
+            {"frequency": np.float64(8000.0), "peak_id": 3.0, "fit": {"A": [1, 2]}}
+        )
+    assert len(catalog) == 1
+
+
+def test_search_frequency(catalog, cat_path):
+    """
+    Frequency searches should match on either the observed or the catalog
+    frequency, and return documents in the order they were inserted.
+    """
+    catalog.add_catalog(cat_path, "hc3n", "HC3N")
+    catalog.add_entry({"name": "u", "frequency": 8000.05, "catalog_frequency": 16000.0})
+    matches = catalog.search_frequency(8000.0, dataframe=False)
+    assert [match["name"] for match in matches] == ["hc3n", "u"]
+    matches = catalog.search_frequency(16000.0, dataframe=False)
+    assert [match.doc_id for match in matches] == [2, 3]
+    # relative window
+    assert len(catalog.search_frequency(16000.0, freq_prox=1e-6, freq_abs=False)) == 2
+    assert catalog.search_frequency(12000.0) is None
+
+
+def test_search_cache_invalidation(catalog):
+    """
+    Every way of writing to the database should be reflected in subsequent
+    searches, including the ones that aren't overridden by SpectralCatalog.
+    """
+    catalog.insert({"name": "a", "frequency": 10.0})
+    assert catalog.search_frequency(50.0) is None
+    assert catalog.search_molecule("b") is None
+    catalog.upsert({"name": "b", "frequency": 50.0}, tinydb.where("name") == "b")
+    assert len(catalog.search_frequency(50.0)) == 1
+    assert len(catalog.search_molecule("b")) == 1
+    catalog.update_multiple([({"frequency": 60.0}, tinydb.where("name") == "b")])
+    assert catalog.search_frequency(50.0) is None
+    assert len(catalog.search_frequency(60.0)) == 1
+    catalog.table(catalog.default_table_name).remove(tinydb.where("name") == "b")
+    assert catalog.search_frequency(60.0) is None
+    assert catalog.search_molecule("b") is None
+    # the duplicate check should also see writes that bypass the overrides
+    catalog.add_entry({"name": "c", "frequency": 1.0})
+    catalog.upsert({"name": "d", "frequency": 2.0}, tinydb.where("name") == "d")
+    with pytest.warns(UserWarning):
+        catalog.add_entry({"name": "d", "frequency": 2.0})
+    assert len(catalog) == 3
@@ -0,0 +1,111 @@
+"""
+test_radiative.py
+
+PyTests to check the parsing of SPCAT .str files and the calculation of
+Einstein A coefficients in `pyspectools.astro.radiative`.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyspectools.astro import radiative
+
+STR_FILE = """\
+   12345.6789   0.123456E+01    1     1  0  1     0  0  0          1
+    1000.1234  -0.223456E-01    1     2  1  1     1  0  1          2
+
+   20000.0000   0.5000000000    0     3  0  3     2  0  2          1
+"""
+
+
+@pytest.fixture
+def str_path(tmp_path):
+    path = tmp_path.joinpath("test.str")
+    path.write_text(STR_FILE)
+    return str(path)
+
+
+def test_parse_str(str_path):
+    """
+    Compare the parsed .str file against the fixed-width reader in pandas.
+    """
+    str_df = radiative.parse_str(str_path)
+    reference = pd.read_fwf(
+        str_path,
+        widths=[15, 15, 5, 12, 12, 11],
+        names=list(str_df.columns),
+    )
+    assert len(str_df) == 3
+    for column in ["Frequency", "RTDM", "Formatting", "Dipole Category"]:
+        np.testing.assert_allclose(str_df[column], reference[column])
+    for column in ["Upper QN", "Lower QN"]:
+        pd.testing.assert_series_equal(str_df[column], reference[column])
+
+
+def test_parse_str_numeric_fields(tmp_path):
+    """
+    Quantum numbers that are all numeric should be parsed as numbers like
+    read_fwf does, and blank or overflowed values should become NaN.
+    """
+    path = tmp_path.joinpath("linear.str")
+    fields = [
+        ("1000.0000", "0.100000E+01", "1", "1", "0", "1"),
+        ("2000.0000", "*" * 15, "1", "2", "", "1"),
+        ("", "0.100000E+01", "1", "3", "2", "1"),
+    ]
+    widths = [15, 15, 5, 12, 12, 11]
+    path.write_text(
+        "".join(
+            "".join(field.rjust(width) for field, width in zip(line, widths)) + "\n"
+            for line in fields
+        )
+    )
+    str_df = radiative.parse_str(str(path))
+    reference = pd.read_fwf(
+        path,
+        widths=widths,
+        names=list(str_df.columns),
+    )
+    for column in ["Upper QN", "Lower QN"]:
+        pd.testing.assert_series_equal(str_df[column], reference[column])
+    assert str_df["Upper QN"].dtype.kind == "i"
+    assert str_df["Lower QN"].isna().tolist() == [False, True, False]
+    assert str_df["Frequency"].isna().tolist() == [False, False, True]
+    assert str_df["RTDM"].isna().tolist() == [False, True, False]
+
+
+def test_parse_str_columns(str_path):
+    """
+    Parsing a subset of the columns should give the same values as the
+    full parse.
+    """
+    full_df = radiative.parse_str(str_path)
+    subset_df = radiative.parse_str(str_path, columns=["Frequency", "RTDM"])
+    assert list(subset_df.columns) == ["Frequency", "RTDM"]
+    pd.testing.assert_frame_equal(subset_df, full_df[["Frequency", "RTDM"]])
+    for columns in [[], ["Frequency", "Intensity"]]:
+        with pytest.raises(ValueError):
+            radiative.parse_str(str_path, columns=columns)
+
+
+def test_calc_einstein(str_path):
+    str_df = radiative.calc_einstein(str_path)
+    assert np.all(np.diff(str_df["Frequency"]) > 0.0)
+    expected = 1.163965505e-20 * str_df["Frequency"] ** 3.0 * str_df["RTDM"] ** 2.0
+    np.testing.assert_allclose(str_df["Einstein A"], expected)
+
+
+def test_ufunc_arguments():
+    """
+    The kernels should take keyword arguments, pass ufunc options through,
+    and expose the compiled ufuncs for their methods.
+    """
+    assert radiative.boltzmann_factor(E=100.0, T=300.0) == pytest.approx(
+        np.exp(-100.0 / (radiative.kbcm * 300.0))
+    )
+    out = np.empty(3)
+    radiative.einsteinA(np.ones(3), frequency=np.arange(3.0), out=out)
+    np.testing.assert_allclose(out, 1.163965505e-20 * np.arange(3.0) ** 3.0)
+    assert isinstance(radiative.boltzmann_factor_ufunc, np.ufunc)
+    assert radiative.einsteinA_ufunc.reduce is not None